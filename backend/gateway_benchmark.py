@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import subprocess
+import tracemalloc
+
+# Lets the benchmark import main.py without a real .env or touching the real database
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+os.environ.setdefault("OWNER_ID", "0")
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+# main.py logs to bot.log through logging.basicConfig, which does nothing once the root logger
+# has a handler. Configuring it first keeps benchmark runs out of the bot's log file
+logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+
+GUILD_ID = 1
+CHANNEL_ID = 2
+
+def get_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return 0.0
+
+def user_payload(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None}
+
+def member_payload(user_id: int) -> dict:
+    return {"user": user_payload(user_id), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False, "mute": False, "flags": 0}
+
+def guild_payload(members: int) -> dict:
+    # Equivalent to a GUILD_CREATE followed by member chunking in a guild of the given size
+    return {
+        "id": str(GUILD_ID),
+        "name": "Large guild",
+        "owner_id": "1000",
+        "member_count": members,
+        "large": True,
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0,
+                   "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [{"id": str(CHANNEL_ID), "type": 0, "name": "general", "position": 0,
+                      "permission_overwrites": []}],
+        "members": [member_payload(1000 + index) for index in range(members)],
+        "emojis": [],
+        "stickers": [],
+        "features": []
+    }
+
+def message_payload(message_id: int, author_id: int) -> dict:
+    return {
+        "id": str(message_id),
+        "channel_id": str(CHANNEL_ID),
+        "guild_id": str(GUILD_ID),
+        "author": user_payload(author_id),
+        "member": {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False,
+                   "flags": 0},
+        "content": "regular chat message " * 4,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0
+    }
+
+async def measure(lean: bool, members: int, messages: int) -> dict:
+    from main import create_bot
+    bot = create_bot(lean)
+    # Normally done by login(); binds the bot to this loop so events can be dispatched
+    await bot._async_setup_hook()
+    state = bot._connection
+
+    # The payload is built first so only what the bot keeps from it is measured
+    data = guild_payload(members)
+    tracemalloc.start()
+    guild = state._add_guild_from_data(data)
+    del data
+    for index in range(messages):
+        state.parse_message_create(message_payload(10_000_000 + index, 1000 + index % members))
+    # Let on_message handlers that were dispatched run to completion
+    await asyncio.sleep(0.1)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mode": "lean" if lean else "default",
+        "intents": bot.intents.value,
+        "cached_members": len(guild._members),
+        "cached_messages": len(state._messages or []),
+        "python_heap_mb": retained / (1024 * 1024),
+        "rss_mb": get_rss_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bot gateway memory with and without LEAN_GATEWAY")
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=5_000)
+    parser.add_argument("--mode", choices=["default", "lean"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = asyncio.run(measure(args.mode == "lean", args.members, args.messages))
+        print(json.dumps(result))
+        return
+
+    # Each mode runs in a fresh process so the RSS numbers don't influence each other
+    print(f"Simulated guild: {args.members} members, {args.messages} messages\n")
+    print(f"{'mode':<8} {'members cached':>15} {'messages cached':>16} {'python heap':>12} {'process rss':>12}")
+    for mode in ("default", "lean"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--members", str(args.members),
+             "--messages", str(args.messages)],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['mode']:<8} {result['cached_members']:>15} {result['cached_messages']:>16} "
+            f"{result['python_heap_mb']:>9.1f} MB {result['rss_mb']:>9.1f} MB"
+        )
+
+if __name__ == "__main__":
+    main()
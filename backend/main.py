@@ -2,24 +2,62 @@
 import discord
 from discord.ext import commands
 import asyncio
-from fastapi import FastAPI, Depends, HTTPException, Security
+import aiohttp
+from fastapi import FastAPI, Depends, HTTPException, Request, Security
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security.api_key import APIKeyHeader
 from datetime import datetime, timedelta
 import uvicorn
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
-from sqlalchemy import create_engine, Column, String, DateTime, Text
+import re
+import io
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from collections import Counter
+from sqlalchemy import create_engine, Column, String, DateTime, Text, Integer, Index, inspect, text, or_, func, select
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import uuid
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from starlette.status import HTTP_403_FORBIDDEN
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_409_CONFLICT
 
 class Settings(BaseSettings):
     DISCORD_TOKEN: str
     OWNER_ID: str
-    API_KEY: str
+    API_KEY: str  # held by the heartbeat clients, only grants /ping and /check
+    ADMIN_API_KEY: Optional[str] = None  # grants the message, replication and debug routes; they are disabled while unset
     DATABASE_URL: str = "sqlite:///./hidden_messages.db"
+    HEARTBEAT_INTERVAL: int = 15  # seconds between client pings when the server is idle
+    HEARTBEAT_MAX_INTERVAL: int = 120  # upper bound the interval is stretched to under load
+    HEARTBEAT_TARGET_RATE: float = 20.0  # total pings per second the server aims to receive
+    HEARTBEAT_TTL_FACTOR: float = 2.0  # a session stays active for this many intervals after a ping
+    SYNC_APP_COMMANDS: bool = False  # register slash commands with Discord on startup; enable once after they change
+    DEFAULT_MESSAGE_TTL: Optional[int] = None  # seconds until new messages expire, None keeps them forever
+    CATEGORY_TTLS: Dict[str, int] = {}  # per-category TTL in seconds, e.g. CATEGORY_TTLS='{"temp": 3600}'
+    EXPIRY_SWEEP_INTERVAL: int = 60  # seconds between runs of the expired message sweeper
+    EXPIRY_SWEEP_BATCH: int = 500  # rows deleted per transaction by the sweeper
+    API_PORT: int = 8000
+    FOLLOW_URL: Optional[str] = None  # API URL of the primary; when set this instance runs as a read-only replica
+    FOLLOW_POLL_INTERVAL: float = 1.0  # seconds between journal polls once the replica has caught up
+    FOLLOW_BATCH: int = 500  # journal entries fetched and applied per transaction
+    JOURNAL_RETENTION: int = 604800  # seconds journal entries are kept; followers further behind reload a snapshot
+    TRACING_ENABLED: bool = False  # record per-phase timings for every command and API request
+    SLOW_OPERATION_MS: float = 500.0  # traced operations slower than this are logged with their span breakdown
+    PROFILE_MAX_SECONDS: float = 60.0  # longest run allowed for the profiling endpoint
+    PROFILE_SAMPLE_INTERVAL: float = 0.005  # seconds between stack samples while profiling
+    LEAN_GATEWAY: bool = False  # only request the intents the commands need and skip the member cache
+    MESSAGE_CACHE_SIZE: int = 0  # messages kept in the cache in lean mode, 0 disables it (discord.py default: 1000)
+    AUTO_SHARD: bool = False  # let Discord decide the shard count, useful once the bot is in many guilds
+    VIEW_ATTACHMENT_THRESHOLD: int = 8000  # characters above which !view sends one file instead of many messages
+    VIEW_ATTACHMENT_COMPRESS: bool = False  # gzip the !view attachment
     
     class Config:
         env_file = ".env"
@@ -46,20 +84,152 @@ class HiddenMessage(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     author_id = Column(String, nullable=False)
     category = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_hidden_messages_expires_at", "expires_at"),
+    )
+
+class CategoryStats(Base):
+    # Kept up to date by MessageManager so listing categories never scans hidden_messages
+    __tablename__ = "category_stats"
+
+    category = Column(String, primary_key=True)  # "" stands for messages without a category
+    message_count = Column(Integer, nullable=False, default=0)
+    last_updated = Column(DateTime, default=datetime.utcnow)
+
+class JournalEntry(Base):
+    # Append-only log of every change, tailed by followers to keep a replica in sync.
+    # The "add" entry of a message is removed when the message is deleted, so deleted
+    # secrets don't stay in the journal, and entries older than JOURNAL_RETENTION are pruned
+    __tablename__ = "change_journal"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    operation = Column(String, nullable=False)
+    message_id = Column(String, nullable=True)  # set for "add" entries
+    payload = Column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_change_journal_message_id", "message_id"),
+        Index("ix_change_journal_timestamp", "timestamp"),
+        {"sqlite_autoincrement": True}
+    )
+
+class JournalState(Base):
+    # Single row holding the highest seq removed by pruning. A follower whose checkpoint is
+    # below it has missed entries and has to reload a snapshot
+    __tablename__ = "journal_state"
+
+    id = Column(Integer, primary_key=True)
+    compacted_through = Column(Integer, nullable=False, default=0)
+
+class ReplicationState(Base):
+    # Single row on a follower holding the last journal entry it applied
+    __tablename__ = "replication_state"
+
+    id = Column(Integer, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+
+def format_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def message_payload(message) -> dict:
+    return {
+        "id": message.id,
+        "content": message.content,
+        "timestamp": format_datetime(message.timestamp),
+        "author_id": message.author_id,
+        "category": message.category,
+        "expires_at": format_datetime(message.expires_at)
+    }
+
+def message_from_payload(payload: dict) -> HiddenMessage:
+    return HiddenMessage(
+        id=payload["id"],
+        content=payload["content"],
+        timestamp=parse_datetime(payload["timestamp"]),
+        author_id=payload["author_id"],
+        category=payload["category"],
+        expires_at=parse_datetime(payload["expires_at"])
+    )
+
+def upgrade_schema(engine) -> None:
+    # create_all only creates missing tables, so columns added later are patched in here
+    columns = {column["name"] for column in inspect(engine).get_columns(HiddenMessage.__tablename__)}
+    with engine.begin() as connection:
+        if "expires_at" not in columns:
+            connection.execute(text("ALTER TABLE hidden_messages ADD COLUMN expires_at DATETIME"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_hidden_messages_expires_at ON hidden_messages (expires_at)"
+            ))
+        # Databases from before category_stats existed get a one-time backfill
+        if connection.execute(text("SELECT 1 FROM category_stats LIMIT 1")).first() is None:
+            connection.execute(text(
+                "INSERT INTO category_stats (category, message_count, last_updated) "
+                "SELECT COALESCE(category, ''), COUNT(*), MAX(timestamp) FROM hidden_messages "
+                "GROUP BY COALESCE(category, '')"
+            ))
+        journal_columns = {column["name"] for column in inspect(connection).get_columns(JournalEntry.__tablename__)}
+        if "message_id" not in journal_columns:
+            connection.execute(text("ALTER TABLE change_journal ADD COLUMN message_id VARCHAR"))
+            connection.execute(text(
+                "UPDATE change_journal SET message_id = json_extract(payload, '$.id') WHERE operation = 'add'"
+            ))
+            # Journals written before deletes redacted them still hold deleted messages
+            connection.execute(text(
+                "DELETE FROM change_journal WHERE operation = 'add' "
+                "AND message_id NOT IN (SELECT id FROM hidden_messages)"
+            ))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_change_journal_message_id ON change_journal (message_id)"
+            ))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_change_journal_timestamp ON change_journal (timestamp)"
+            ))
 
 engine = create_engine(settings.DATABASE_URL)
 Base.metadata.create_all(engine)
+upgrade_schema(engine)
 SessionLocal = sessionmaker(bind=engine)
 
 app = FastAPI(title="Discord Hidden Messages API")
 api_key_header = APIKeyHeader(name="X-API-Key")
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+def build_intents(lean: bool) -> discord.Intents:
+    if not lean:
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.members = True
+        return intents
+    # Prefix commands need message events and their content, slash commands need guilds.
+    # All output goes to the command author, so members and presences are never needed
+    return discord.Intents(
+        guilds=True,
+        guild_messages=True,
+        dm_messages=True,
+        message_content=True
+    )
+
+def create_bot(lean: bool, auto_shard: bool = False) -> commands.Bot:
+    bot_class = commands.AutoShardedBot if auto_shard else commands.Bot
+    options = {}
+    if lean:
+        options = {
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "max_messages": settings.MESSAGE_CACHE_SIZE or None,
+            "chunk_guilds_at_startup": False
+        }
+    return bot_class(command_prefix="!", intents=build_intents(lean), **options)
 
+bot = create_bot(settings.LEAN_GATEWAY, settings.AUTO_SHARD)
+
+# user_id -> time after which the session is no longer considered active
 active_users: Dict[str, datetime] = {}
+last_prune = datetime.utcnow()
 
 async def get_api_key(api_key_header: str = Security(api_key_header)):
     if api_key_header != settings.API_KEY:
@@ -69,20 +239,122 @@ async def get_api_key(api_key_header: str = Security(api_key_header)):
         )
     return api_key_header
 
+async def get_admin_api_key(api_key_header: str = Security(api_key_header)):
+    # Separate from API_KEY, which is stored on every client machine running the heartbeat
+    if not settings.ADMIN_API_KEY or api_key_header != settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail="Invalid admin API key"
+        )
+    return api_key_header
+
+class Trace:
+    # Collects the time spent in each named span of one command or request
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        totals = self.spans.setdefault(name, [0.0, 0])
+        totals[0] += elapsed_ms
+        totals[1] += 1
+
+    def finish(self) -> None:
+        total_ms = (time.perf_counter() - self.start) * 1000
+        if total_ms < settings.SLOW_OPERATION_MS:
+            return
+        breakdown = ", ".join(
+            f"{name}={elapsed:.1f}ms" + (f" x{count}" if count > 1 else "")
+            for name, (elapsed, count) in self.spans.items()
+        )
+        logger.warning(f"Slow operation {self.name}: {total_ms:.1f}ms ({breakdown or 'no spans'})")
+
+class Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.trace.add(self.name, (time.perf_counter() - self.start) * 1000)
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+NULL_SPAN = nullcontext()
+
+def span(name: str):
+    # With tracing off no Trace is ever set, so this is one ContextVar lookup
+    trace = current_trace.get()
+    return NULL_SPAN if trace is None else Span(trace, name)
+
+class traced:
+    # Starts a Trace for the duration of a command or request when tracing is enabled
+    def __init__(self, name: str):
+        self.trace = Trace(name) if settings.TRACING_ENABLED else None
+
+    def __enter__(self):
+        if self.trace:
+            self.token = current_trace.set(self.trace)
+
+    def __exit__(self, *exc_info):
+        if self.trace:
+            current_trace.reset(self.token)
+            self.trace.finish()
+
+class SamplingProfiler:
+    # Samples the stack of one thread at a fixed interval and counts identical stacks
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+
+    def run(self, seconds: float) -> Counter:
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+        return stacks
+
+profiler_lock = asyncio.Lock()
+
+# Selects messages without a category in deletes, matching how category_stats stores them
+NO_CATEGORY = ""
+NO_CATEGORY_LABEL = "Not set"
+
 class MessageManager:
     def __init__(self):
         self.db = SessionLocal()
     
-    def add_message(self, content: str, author_id: str, category: Optional[str] = None) -> str:
+    def resolve_ttl(self, category: Optional[str], ttl: Optional[int] = None) -> Optional[int]:
+        if ttl is not None:
+            return ttl
+        return settings.CATEGORY_TTLS.get(category, settings.DEFAULT_MESSAGE_TTL)
+
+    def add_message(self, content: str, author_id: str, category: Optional[str] = None,
+                    ttl: Optional[int] = None) -> str:
         message_id = str(uuid.uuid4())[:8]
+        ttl = self.resolve_ttl(category, ttl)
         message = HiddenMessage(
             id=message_id,
             content=content,
+            timestamp=datetime.utcnow(),
             author_id=author_id,
-            category=category
+            category=category,
+            expires_at=datetime.utcnow() + timedelta(seconds=ttl) if ttl else None
         )
         try:
-            self.db.add(message)
+            self._insert(message)
             self.db.commit()
             return message_id
         except Exception as e:
@@ -91,145 +363,828 @@ class MessageManager:
             raise
     
     def get_messages(self, category: Optional[str] = None):
-        query = self.db.query(HiddenMessage)
+        # Expired rows are hidden even if the sweeper has not deleted them yet
+        query = self.db.query(HiddenMessage).filter(
+            or_(HiddenMessage.expires_at.is_(None), HiddenMessage.expires_at > datetime.utcnow())
+        )
         if category:
             query = query.filter(HiddenMessage.category == category)
         return query.all()
     
+    def iter_messages(self, category: Optional[str] = None, batch_size: int = 500):
+        # Same rows as get_messages, fetched in batches instead of loaded all at once
+        query = self.db.query(HiddenMessage).filter(
+            or_(HiddenMessage.expires_at.is_(None), HiddenMessage.expires_at > datetime.utcnow())
+        )
+        if category:
+            query = query.filter(HiddenMessage.category == category)
+        return query.yield_per(batch_size)
+
     def delete_message(self, message_id: str) -> bool:
-        message = self.db.query(HiddenMessage).filter(HiddenMessage.id == message_id).first()
-        if message:
-            self.db.delete(message)
+        return self.delete_messages(ids=[message_id]) > 0
+
+    def delete_messages(self, ids: Optional[List[str]] = None, category: Optional[str] = None,
+                        older_than: Optional[datetime] = None) -> int:
+        # All given criteria must match. Runs as one DELETE in a single transaction.
+        # category=NO_CATEGORY matches messages that were added without a category
+        if not ids and category is None and not older_than:
+            raise ValueError("No delete criteria given")
+
+        try:
+            deleted = self._delete(ids, category, older_than)
             self.db.commit()
-            return True
-        return False
+            return deleted
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error deleting messages: {e}")
+            raise
+
+    def _insert(self, message: HiddenMessage) -> None:
+        self.db.add(message)
+        self._update_category_stats({message.category: 1})
+        self._journal("add", message_payload(message), message.id)
+
+    def _delete(self, ids: Optional[List[str]], category: Optional[str], older_than: Optional[datetime]) -> int:
+        conditions = []
+        if ids:
+            conditions.append(HiddenMessage.id.in_(ids))
+        if category == NO_CATEGORY:
+            conditions.append(HiddenMessage.category.is_(None))
+        elif category is not None:
+            conditions.append(HiddenMessage.category == category)
+        if older_than:
+            conditions.append(HiddenMessage.timestamp < older_than)
+
+        counts = self.db.query(HiddenMessage.category, func.count()).filter(
+            *conditions
+        ).group_by(HiddenMessage.category).all()
+        if not counts:
+            return 0
+        # Redact the journaled content of the deleted messages before the rows themselves go
+        self.db.query(JournalEntry).filter(
+            JournalEntry.operation == "add",
+            JournalEntry.message_id.in_(select(HiddenMessage.id).where(*conditions))
+        ).delete(synchronize_session=False)
+        deleted = self.db.query(HiddenMessage).filter(*conditions).delete(synchronize_session=False)
+        self._update_category_stats({category: -count for category, count in counts})
+        # The criteria are journaled rather than the matched IDs. Followers apply entries in order,
+        # so they hold the same rows at this point and the same criteria match the same rows.
+        # Followers that had not applied a redacted "add" yet simply never see the message
+        self._journal("delete", {
+            "ids": ids,
+            "category": category,
+            "older_than": format_datetime(older_than)
+        })
+        return deleted
+
+    def _journal(self, operation: str, payload: dict, message_id: Optional[str] = None) -> None:
+        # Written in the caller's transaction, so the journal has exactly the committed changes
+        self.db.add(JournalEntry(operation=operation, message_id=message_id, payload=json.dumps(payload)))
+
+    def _update_category_stats(self, changes: Dict[Optional[str], int]) -> None:
+        # Runs inside the caller's transaction so the counts never drift from the messages
+        now = datetime.utcnow()
+        for category, delta in changes.items():
+            stats = self.db.get(CategoryStats, category or "")
+            if stats is None:
+                if delta <= 0:
+                    continue
+                stats = CategoryStats(category=category or "", message_count=0)
+                self.db.add(stats)
+            stats.message_count += delta
+            stats.last_updated = now
+            if stats.message_count <= 0:
+                self.db.delete(stats)
+
+    def get_categories(self):
+        # Counts still include expired rows the sweeper hasn't deleted yet, for up to EXPIRY_SWEEP_INTERVAL
+        return self.db.query(CategoryStats).order_by(CategoryStats.category).all()
+
+    def delete_expired(self, batch_size: int) -> int:
+        # Deletes at most batch_size expired rows in one short transaction
+        expired_ids = [
+            row.id for row in self.db.query(HiddenMessage.id)
+            .filter(HiddenMessage.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+        ]
+        if not expired_ids:
+            return 0
+        try:
+            deleted = self._delete(expired_ids, None, None)
+            self.db.commit()
+            return deleted
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error deleting expired messages: {e}")
+            raise
+
+    def get_journal(self, after: int, limit: int):
+        return self.db.query(JournalEntry).filter(
+            JournalEntry.seq > after
+        ).order_by(JournalEntry.seq).limit(limit).all()
+
+    def get_compacted_through(self) -> int:
+        state = self.db.get(JournalState, 1)
+        return state.compacted_through if state else 0
+
+    def get_snapshot(self) -> Tuple[int, list]:
+        # All current rows plus the journal position they correspond to. Writes run on the same
+        # thread as this call, so nothing can commit between the two reads
+        last_seq = self.db.query(func.max(JournalEntry.seq)).scalar() or 0
+        messages = self.db.query(HiddenMessage).all()
+        return max(last_seq, self.get_compacted_through()), messages
+
+    def compact_journal(self, retention: int) -> int:
+        # Prunes entries older than the retention window. Followers that still needed them
+        # notice through compacted_through and reload a snapshot
+        cutoff = datetime.utcnow() - timedelta(seconds=retention)
+        try:
+            pruned_through = self.db.query(func.max(JournalEntry.seq)).filter(
+                JournalEntry.timestamp < cutoff
+            ).scalar()
+            if pruned_through is None:
+                return 0
+            pruned = self.db.query(JournalEntry).filter(
+                JournalEntry.seq <= pruned_through
+            ).delete(synchronize_session=False)
+            self._set_compacted_through(pruned_through)
+            self.db.commit()
+            return pruned
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error compacting journal: {e}")
+            raise
+
+    def _set_compacted_through(self, seq: int) -> None:
+        state = self.db.get(JournalState, 1)
+        if state is None:
+            self.db.add(JournalState(id=1, compacted_through=seq))
+        else:
+            state.compacted_through = max(state.compacted_through, seq)
+
+    def get_checkpoint(self) -> int:
+        state = self.db.get(ReplicationState, 1)
+        return state.last_seq if state else 0
+
+    def apply_journal(self, entries: List[dict]) -> int:
+        # Applies a batch of entries from the primary and moves the checkpoint in the same
+        # transaction, so a follower that stops at any point resumes without gaps or repeats
+        state = self.db.get(ReplicationState, 1) or ReplicationState(id=1, last_seq=0)
+        try:
+            for entry in entries:
+                if entry["seq"] <= state.last_seq:
+                    continue
+                payload = entry["payload"]
+                if entry["operation"] == "add":
+                    self._insert(message_from_payload(payload))
+                elif entry["operation"] == "delete":
+                    self._delete(payload["ids"], payload["category"], parse_datetime(payload["older_than"]))
+                state.last_seq = entry["seq"]
+            self.db.merge(state)
+            self.db.commit()
+            return state.last_seq
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error applying journal: {e}")
+            raise
+
+    def apply_snapshot(self, seq: int, messages: List[dict]) -> int:
+        # Replaces the local data with the primary's snapshot and moves the checkpoint to it
+        try:
+            # This instance's own journal no longer matches its data, so any follower of it
+            # has to reload a snapshot as well
+            own_last_seq = self.db.query(func.max(JournalEntry.seq)).scalar() or 0
+            self.db.query(JournalEntry).delete(synchronize_session=False)
+            self._set_compacted_through(own_last_seq)
+            self.db.query(HiddenMessage).delete(synchronize_session=False)
+            self.db.query(CategoryStats).delete(synchronize_session=False)
+            self.db.flush()
+            self.db.add_all(message_from_payload(payload) for payload in messages)
+            self._update_category_stats(Counter(payload["category"] for payload in messages))
+            self.db.merge(ReplicationState(id=1, last_seq=seq))
+            self.db.commit()
+            return seq
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error applying snapshot: {e}")
+            raise
 
 message_manager = MessageManager()
 
+TTL_PATTERN = re.compile(r"^(\d+)([smhd]?)$")
+TTL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_ttl(value: str) -> int:
+    # Accepts plain seconds or a number with an s/m/h/d suffix, e.g. "90", "30m", "7d"
+    match = TTL_PATTERN.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid TTL: {value}")
+    return int(match.group(1)) * TTL_UNITS[match.group(2)]
+
+async def sweep_expired_messages():
+    while True:
+        try:
+            total = 0
+            while True:
+                deleted = message_manager.delete_expired(settings.EXPIRY_SWEEP_BATCH)
+                total += deleted
+                if deleted < settings.EXPIRY_SWEEP_BATCH:
+                    break
+                # Yield between batches so commands are not blocked behind a long purge
+                await asyncio.sleep(0)
+            if total:
+                logger.info(f"Deleted {total} expired messages")
+            pruned = message_manager.compact_journal(settings.JOURNAL_RETENTION)
+            if pruned:
+                logger.info(f"Pruned {pruned} journal entries")
+        except Exception as e:
+            logger.error(f"Error in expiry sweeper: {e}")
+        await asyncio.sleep(settings.EXPIRY_SWEEP_INTERVAL)
+
+def prune_active_users(now: datetime) -> None:
+    # Expired sessions would otherwise inflate the client count used for scheduling
+    global last_prune
+    if now - last_prune < timedelta(seconds=settings.HEARTBEAT_INTERVAL):
+        return
+    last_prune = now
+    for user_id, expires in list(active_users.items()):
+        if expires < now:
+            del active_users[user_id]
+
+def heartbeat_schedule() -> Tuple[int, int]:
+    # Stretch the interval so that all active clients together stay around
+    # HEARTBEAT_TARGET_RATE pings per second, then derive the session TTL from it.
+    clients = max(len(active_users), 1)
+    interval = max(settings.HEARTBEAT_INTERVAL, round(clients / settings.HEARTBEAT_TARGET_RATE))
+    interval = min(interval, settings.HEARTBEAT_MAX_INTERVAL)
+    ttl = int(interval * settings.HEARTBEAT_TTL_FACTOR)
+    return interval, ttl
+
 @app.post("/ping/{user_id}")
 async def ping(user_id: str, api_key: str = Depends(get_api_key)):
-    active_users[user_id] = datetime.utcnow()
+    now = datetime.utcnow()
+    with span("schedule"):
+        prune_active_users(now)
+        interval, ttl = heartbeat_schedule()
+        active_users[user_id] = now + timedelta(seconds=ttl)
     logger.info(f"Received ping from user {user_id}")
-    return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}
+    with span("render"):
+        return JSONResponse({
+            "status": "ok",
+            "timestamp": now.isoformat(),
+            "next_ping": interval,
+            "ttl": ttl
+        })
 
 @app.get("/check/{user_id}")
 async def check_user(user_id: str, api_key: str = Depends(get_api_key)):
-    if user_id not in active_users:
-        return {"active": False}
-    
-    if datetime.utcnow() - active_users[user_id] > timedelta(seconds=30):
-        del active_users[user_id]
-        return {"active": False}
-    
-    return {"active": True}
+    with span("lookup"):
+        active = check_app_running(user_id)
+        if not active:
+            active_users.pop(user_id, None)
+    with span("render"):
+        return JSONResponse({"active": active})
+
+class BulkDeleteRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    category: Optional[str] = None  # "" deletes messages without a category
+    older_than: Optional[datetime] = None
+
+async def trace_requests(request: Request, call_next):
+    with traced(f"{request.method} {request.url.path}"):
+        return await call_next(request)
+
+# Only registered when enabled, so requests skip the middleware entirely otherwise
+if settings.TRACING_ENABLED:
+    app.middleware("http")(trace_requests)
+
+async def require_primary():
+    if settings.FOLLOW_URL:
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail="This instance is a read-only replica"
+        )
+
+@app.post("/messages/delete", dependencies=[Depends(require_primary)])
+async def bulk_delete(request: BulkDeleteRequest, api_key: str = Depends(get_admin_api_key)):
+    try:
+        with span("db"):
+            deleted = message_manager.delete_messages(request.ids, request.category, request.older_than)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info(f"Deleted {deleted} messages through the API")
+    with span("render"):
+        return JSONResponse({"deleted": deleted})
+
+@app.get("/messages")
+async def list_messages(category: Optional[str] = None, api_key: str = Depends(get_admin_api_key)):
+    with span("db"):
+        messages = message_manager.get_messages(category)
+    # Responses are serialized here rather than by FastAPI after returning, so the render span
+    # includes the JSON encoding
+    with span("render"):
+        return JSONResponse({"messages": [message_payload(message) for message in messages]})
+
+@app.get("/journal")
+async def read_journal(after: int = 0, limit: int = 500, api_key: str = Depends(get_admin_api_key)):
+    with span("db"):
+        entries = message_manager.get_journal(after, max(1, min(limit, 5000)))
+        compacted_through = message_manager.get_compacted_through()
+    with span("render"):
+        return JSONResponse({
+            # Entries up to here were pruned; a follower behind it has to load /snapshot instead
+            "compacted_through": compacted_through,
+            "entries": [
+                {"seq": entry.seq, "operation": entry.operation, "payload": json.loads(entry.payload)}
+                for entry in entries
+            ]
+        })
+
+@app.get("/snapshot")
+async def read_snapshot(api_key: str = Depends(get_admin_api_key)):
+    with span("db"):
+        seq, messages = message_manager.get_snapshot()
+    with span("render"):
+        return JSONResponse({"seq": seq, "messages": [message_payload(message) for message in messages]})
+
+@app.get("/categories")
+async def list_categories(api_key: str = Depends(get_admin_api_key)):
+    with span("db"):
+        categories = message_manager.get_categories()
+    with span("render"):
+        return JSONResponse({
+            "categories": [
+                {
+                    "category": stats.category or None,
+                    "message_count": stats.message_count,
+                    "last_updated": stats.last_updated.isoformat() if stats.last_updated else None
+                }
+                for stats in categories
+            ]
+        })
+
+@app.post("/debug/profile")
+async def profile(seconds: float = 5.0, api_key: str = Depends(get_admin_api_key)):
+    # Samples the event loop thread, where the bot and API run, and returns collapsed stacks
+    # ("frame;frame;frame count" per line) that flamegraph tools can read directly
+    if profiler_lock.locked():
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="A profile is already running")
+    seconds = max(0.0, min(seconds, settings.PROFILE_MAX_SECONDS))
+    async with profiler_lock:
+        profiler = SamplingProfiler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+        stacks = await asyncio.to_thread(profiler.run, seconds)
+    logger.info(f"Profiled for {seconds}s, {sum(stacks.values())} samples")
+    return PlainTextResponse("\n".join(f"{stack} {count}" for stack, count in stacks.most_common()))
 
 def check_app_running(user_id: str) -> bool:
     if user_id not in active_users:
         return False
-    return datetime.utcnow() - active_users[user_id] <= timedelta(seconds=10)
+    return datetime.utcnow() <= active_users[user_id]
 
-@bot.event
-async def on_ready():
-    logger.info(f"Bot is ready {bot.user}")
-    await bot.change_presence(activity=discord.Game(name="Watching messages"))
+DM_UPLOAD_LIMIT = 10 * 1024 * 1024  # bytes Discord accepts per upload outside of guilds
 
-@bot.command(name="viewadd")
-async def viewadd(ctx, category: Optional[str] = None, *, message: str):
-   
-    try:
-        await ctx.message.delete()
-    except Exception as e:
-        logger.error(f"Error deleting message: {e}")
+class PrefixReply:
+    # Prefix commands are public, so the invoking message is deleted and output goes to DMs
+    source = "prefix"
+    upload_limit = DM_UPLOAD_LIMIT
+
+    def __init__(self, ctx: commands.Context):
+        self.ctx = ctx
+        self.api_calls = 0
+
+    async def start(self):
+        try:
+            self.api_calls += 1
+            with span("delete"):
+                await self.ctx.message.delete()
+        except Exception as e:
+            logger.error(f"Error deleting message: {e}")
+
+    async def send(self, content: str):
+        if self.ctx.author.dm_channel is None:
+            self.api_calls += 1  # opening the DM channel
+        self.api_calls += 1
+        with span("send"):
+            await self.ctx.author.send(content)
+
+    async def send_file(self, content: str, file: discord.File):
+        if self.ctx.author.dm_channel is None:
+            self.api_calls += 1  # opening the DM channel
+        self.api_calls += 1
+        with span("send"):
+            await self.ctx.author.send(content, file=file)
+
+class InteractionReply:
+    # Slash commands answer with ephemeral responses, so nothing has to be deleted or DMed
+    source = "slash"
+
+    def __init__(self, interaction: discord.Interaction):
+        self.interaction = interaction
+        self.api_calls = 0
+
+    @property
+    def upload_limit(self) -> int:
+        guild = self.interaction.guild
+        return guild.filesize_limit if guild else DM_UPLOAD_LIMIT
+
+    async def start(self):
+        # Discord drops interactions without a response within 3 seconds, so acknowledge first
+        # and send the real output as followups once the database work is done
+        self.api_calls += 1
+        with span("defer"):
+            await self.interaction.response.defer(ephemeral=True, thinking=True)
+
+    async def send(self, content: str):
+        self.api_calls += 1
+        with span("send"):
+            if not self.interaction.response.is_done():
+                await self.interaction.response.send_message(content, ephemeral=True)
+            else:
+                await self.interaction.followup.send(content, ephemeral=True)
+
+    async def send_file(self, content: str, file: discord.File):
+        self.api_calls += 1
+        with span("send"):
+            if not self.interaction.response.is_done():
+                await self.interaction.response.send_message(content, file=file, ephemeral=True)
+            else:
+                await self.interaction.followup.send(content, file=file, ephemeral=True)
 
-    if str(ctx.author.id) != settings.OWNER_ID:
-        await ctx.author.send("You don't have permission to do this command!")
+async def run_command(name: str, reply, handler, *args, **kwargs):
+    with traced(f"command {name} ({reply.source})"):
+        await reply.start()
+        await handler(reply, *args, **kwargs)
+    logger.info(f"Command {name} ({reply.source}) used {reply.api_calls} Discord API calls")
+
+def split_chunks(content: str) -> List[str]:
+    # Discord messages are limited to 2000 characters, so long output is split on line breaks
+    chunks = []
+    while content:
+        if len(content) <= 1900:
+            chunks.append(content)
+            break
+        split_index = content[:1900].rfind('\n')
+        if split_index <= 0:
+            split_index = 1900
+        chunks.append(content[:split_index])
+        content = content[split_index+1:] if content[split_index:split_index+1] == '\n' else content[split_index:]
+    return chunks
+
+def split_lines(data: bytes, parts: int) -> List[bytes]:
+    # Splits into roughly equal pieces, each ending at the first line break after its share
+    pieces = []
+    start = 0
+    for index in range(1, parts + 1):
+        end = len(data) if index == parts else data.find(b"\n", max(start, len(data) * index // parts)) + 1
+        if end <= start:
+            end = len(data)
+        pieces.append(data[start:end])
+        start = end
+        if start >= len(data):
+            break
+    return pieces
+
+class ViewExport:
+    # Upload buffer for large !view results, written to as rows are rendered
+    MAX_PARTS = 10
+
+    def __init__(self, compress: bool):
+        self.compress = compress
+        self.buffer = io.BytesIO()
+        self.stream = gzip.GzipFile(fileobj=self.buffer, mode="wb") if compress else self.buffer
+
+    def write(self, content: str) -> None:
+        self.stream.write(content.encode())
+
+    def finish(self, limit: int) -> Optional[List[discord.File]]:
+        # Returns the files to upload, each at most limit bytes. An export that is too large
+        # is gzipped and then split into up to MAX_PARTS files; None if even that doesn't fit
+        if self.stream is not self.buffer:
+            self.stream.close()
+        if self.buffer.tell() <= limit:
+            self.buffer.seek(0)
+            filename = "secret_messages.txt.gz" if self.compress else "secret_messages.txt"
+            return [discord.File(self.buffer, filename=filename)]
+
+        with span("split"):
+            data = self.buffer.getvalue()
+            text = gzip.decompress(data) if self.compress else data
+            compressed = data if self.compress else gzip.compress(text)
+            # Start from the fewest parts that could fit and add one until every part does
+            for parts in range(-(-len(compressed) // limit), self.MAX_PARTS + 1):
+                pieces = [gzip.compress(piece) for piece in split_lines(text, parts)]
+                if len(pieces) <= self.MAX_PARTS and all(len(piece) <= limit for piece in pieces):
+                    break
+            else:
+                return None
+
+        if len(pieces) == 1:
+            return [discord.File(io.BytesIO(pieces[0]), filename="secret_messages.txt.gz")]
+        return [
+            discord.File(io.BytesIO(piece), filename=f"secret_messages.part{index}.txt.gz")
+            for index, piece in enumerate(pieces, 1)
+        ]
+
+async def send_chunked(reply, content: str):
+    with span("chunk"):
+        chunks = split_chunks(content)
+    for chunk in chunks:
+        await reply.send(chunk)
+
+async def handle_viewadd(reply, author_id: str, category: Optional[str], message: str,
+                         ttl: Optional[int] = None):
+    if author_id != settings.OWNER_ID:
+        await reply.send("You don't have permission to do this command!")
         return
 
-    if not check_app_running(str(ctx.author.id)):
-        await ctx.author.send("You need to have the secret active to do this command!")
+    if not check_app_running(author_id):
+        await reply.send("You need to have the secret active to do this command!")
+        return
+
+    if category == NO_CATEGORY_LABEL:
+        # The label stands for "no category" in !viewcategories and !viewdeletecategory
+        await reply.send(f'"{NO_CATEGORY_LABEL}" is reserved for messages without a category, please pick another name.')
         return
 
     try:
-        message_id = message_manager.add_message(message, str(ctx.author.id), category)
-        await ctx.author.send(
+        with span("db"):
+            message_id = message_manager.add_message(message, author_id, category, ttl)
+        ttl = message_manager.resolve_ttl(category, ttl)
+        await reply.send(
             f"Message was successfully !\n"
             f"ID: `{message_id}`\n"
-            f"Category: {category or 'Not set'}"
+            f"Category: {category or NO_CATEGORY_LABEL}\n"
+            f"Expires: {f'in {timedelta(seconds=ttl)}' if ttl else 'Never'}"
         )
-        logger.info(f"Added new message {message_id} by user {ctx.author.id}")
+        logger.info(f"Added new message {message_id} by user {author_id}")
     except Exception as e:
         logger.error(f"Error in viewadd: {e}")
-        await ctx.author.send("There was an error while adding a new message")
-
-@bot.command(name="view")
-async def view(ctx, category: Optional[str] = None):
+        await reply.send("There was an error while adding a new message")
 
-    try:
-        await ctx.message.delete()
-    except Exception as e:
-        logger.error(f"Error deleting message: {e}")
+async def handle_prefix_viewadd(reply, author_id: str, category: Optional[str], message: str):
+    # Prefix commands take the TTL as a "ttl=30m" word after the category, so it can't be
+    # mistaken for message text. A malformed TTL is rejected instead of being stored as text
+    ttl_word = None
+    if category and category.lower().startswith("ttl="):
+        # No category given, so the TTL was parsed as one and the whole message follows it
+        ttl_word, category = category, None
+    else:
+        words = message.split(None, 1)
+        if words and words[0].lower().startswith("ttl="):
+            if len(words) < 2:
+                await reply.send("Please provide a message after the TTL.")
+                return
+            ttl_word, message = words
+    ttl = None
+    if ttl_word:
+        try:
+            ttl = parse_ttl(ttl_word[4:])
+        except ValueError as e:
+            await reply.send(f"{e}. Use a TTL such as ttl=30m, ttl=12h or ttl=7d.")
+            return
+    await handle_viewadd(reply, author_id, category, message, ttl)
 
-    if not check_app_running(str(ctx.author.id)):
-        await ctx.author.send("You need to have secret open to run this command")
+async def handle_view(reply, author_id: str, category: Optional[str]):
+    if not check_app_running(author_id):
+        await reply.send("You need to have secret open to run this command")
         return
 
     try:
-        messages = message_manager.get_messages(category)
-        
-        if not messages:
-            await ctx.author.send("No messages" + 
-                                (f" In category {category}" if category else ""))
-            return
+        with span("db"):
+            messages = message_manager.iter_messages(category)
 
-        content = "**Secret messages**\n\n"
+        header = "**Secret messages**\n\n"
         if category:
-            content += f"Category: {category}\n\n"
-
-        for msg in messages:
-            content += (
-                f"**ID: `{msg.id}`** | {msg.timestamp.strftime('%Y-%m-%d %H:%M')}\n"
-                f"{'=' * 40}\n"
-                f"{msg.content}\n\n"
-            )
-
-        while content:
-            if len(content) <= 1900:
-                await ctx.author.send(content)
-                break
-            split_index = content[:1900].rfind('\n')
-            await ctx.author.send(content[:split_index])
-            content = content[split_index+1:]
-
-        logger.info(f"Sent messages to user {ctx.author.id}")
+            header += f"Category: {category}\n\n"
+
+        # Small results are collected and sent as messages. Once the threshold is crossed the
+        # collected text moves into a single attachment and later rows are written straight to it
+        pieces = [header]
+        size = len(header)
+        export = None
+        count = 0
+        # Rows are fetched lazily, so this span includes fetching batches after the first
+        with span("render"):
+            for msg in messages:
+                count += 1
+                rendered = (
+                    f"**ID: `{msg.id}`** | {msg.timestamp.strftime('%Y-%m-%d %H:%M')}\n"
+                    f"{'=' * 40}\n"
+                    f"{msg.content}\n\n"
+                )
+                if export is not None:
+                    export.write(rendered)
+                    continue
+                pieces.append(rendered)
+                size += len(rendered)
+                if size > settings.VIEW_ATTACHMENT_THRESHOLD:
+                    export = ViewExport(settings.VIEW_ATTACHMENT_COMPRESS)
+                    for piece in pieces:
+                        export.write(piece)
+                    pieces = None
+
+        if not count:
+            await reply.send("No messages" + 
+                             (f" In category {category}" if category else ""))
+            return
+
+        if export is not None:
+            limit = reply.upload_limit
+            files = export.finish(limit)
+            if files is None:
+                await reply.send(
+                    f"The {count} messages are too large to upload, even compressed and split into "
+                    f"{ViewExport.MAX_PARTS} files of {limit / (1024 * 1024):.3g} MiB. "
+                    f"View a single category or delete old messages first."
+                )
+                return
+            for index, file in enumerate(files, 1):
+                part = f" (part {index} of {len(files)})" if len(files) > 1 else ""
+                await reply.send_file(f"{count} secret messages are attached{part}.", file)
+        else:
+            await send_chunked(reply, "".join(pieces))
+
+        logger.info(f"Sent messages to user {author_id}")
+    except discord.HTTPException as e:
+        logger.error(f"Error in view: {e}")
+        if e.status == 413:
+            await reply.send("The messages are too large for Discord to accept as an upload")
+        else:
+            await reply.send("There was an error while sending the messages")
     except Exception as e:
         logger.error(f"Error in view: {e}")
-        await ctx.author.send("There was an error while reading the database")
+        await reply.send("There was an error while reading the database")
+
+async def handle_viewcategories(reply, author_id: str):
+    if not check_app_running(author_id):
+        await reply.send("You need to have secret open to run this command")
+        return
 
-@bot.command(name="viewdelete")
-async def viewdelete(ctx, message_id: str):
-   
     try:
-        await ctx.message.delete()
+        with span("db"):
+            categories = message_manager.get_categories()
+        if not categories:
+            await reply.send("No categories")
+            return
+
+        with span("render"):
+            content = "**Categories**\n\n"
+            for stats in categories:
+                content += (
+                    f"**{stats.category or NO_CATEGORY_LABEL}** | {stats.message_count} messages | "
+                    f"updated {stats.last_updated.strftime('%Y-%m-%d %H:%M')}\n"
+                )
+        await send_chunked(reply, content)
+        logger.info(f"Sent categories to user {author_id}")
     except Exception as e:
-        logger.error(f"Error deleting message: {e}")
+        logger.error(f"Error in viewcategories: {e}")
+        await reply.send("There was an error while reading the database")
+
+async def handle_viewdelete(reply, author_id: str, message_ids: List[str]):
+    if author_id != settings.OWNER_ID:
+        await reply.send("You dont have the permission to do this command!")
+        return
 
-    if str(ctx.author.id) != settings.OWNER_ID:
-        await ctx.author.send("You dont have the permission to do this command!")
+    if not check_app_running(author_id):
+        await reply.send("You need to have secret running to do this command!")
         return
 
-    if not check_app_running(str(ctx.author.id)):
-        await ctx.author.send("You need to have secret running to do this command!")
+    if not message_ids:
+        await reply.send("Please provide at least one message ID.")
         return
 
     try:
-        if message_manager.delete_message(message_id):
-            await ctx.author.send(f"Message `{message_id}` was deleted.")
-            logger.info(f"Deleted message {message_id} by user {ctx.author.id}")
+        with span("db"):
+            deleted = message_manager.delete_messages(ids=message_ids)
+        if len(message_ids) > 1:
+            await reply.send(f"Deleted {deleted} of {len(message_ids)} messages.")
+            logger.info(f"Deleted {deleted} messages by user {author_id}")
+        elif deleted:
+            await reply.send(f"Message `{message_ids[0]}` was deleted.")
+            logger.info(f"Deleted message {message_ids[0]} by user {author_id}")
         else:
-            await ctx.author.send(f"Message`{message_id}` not found.")
+            await reply.send(f"Message`{message_ids[0]}` not found.")
     except Exception as e:
         logger.error(f"Error in viewdelete: {e}")
-        await ctx.author.send("There was an error while reading the message")
+        await reply.send("There was an error while reading the message")
+
+async def handle_bulk_delete(reply, author_id: str, description: str, **criteria):
+    if author_id != settings.OWNER_ID:
+        await reply.send("You dont have the permission to do this command!")
+        return
+
+    if not check_app_running(author_id):
+        await reply.send("You need to have secret running to do this command!")
+        return
+
+    try:
+        with span("db"):
+            deleted = message_manager.delete_messages(**criteria)
+        await reply.send(f"Deleted {deleted} messages {description}.")
+        logger.info(f"Deleted {deleted} messages {description} by user {author_id}")
+    except Exception as e:
+        logger.error(f"Error in bulk delete: {e}")
+        await reply.send("There was an error while deleting the messages")
+
+async def handle_viewdeletecategory(reply, author_id: str, category: str):
+    # Messages without a category are listed as "Not set", so the same label selects them here
+    if category == NO_CATEGORY_LABEL:
+        await handle_bulk_delete(reply, author_id, "without a category", category=NO_CATEGORY)
+    else:
+        await handle_bulk_delete(reply, author_id, f"in category {category}", category=category)
+
+async def handle_viewdeleteolder(reply, author_id: str, age: str):
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=parse_ttl(age))
+    except ValueError as e:
+        await reply.send(f"{e}. Use an age such as 30m, 12h or 7d.")
+        return
+    await handle_bulk_delete(reply, author_id, f"older than {age}", older_than=cutoff)
+
+@bot.event
+async def setup_hook():
+    if settings.SYNC_APP_COMMANDS:
+        try:
+            synced = await bot.tree.sync()
+            logger.info(f"Synced {len(synced)} slash commands")
+        except Exception as e:
+            logger.error(f"Error syncing slash commands: {e}")
+
+@bot.event
+async def on_ready():
+    logger.info(f"Bot is ready {bot.user}")
+    await bot.change_presence(activity=discord.Game(name="Watching messages"))
+
+@bot.command(name="viewadd")
+async def viewadd(ctx, category: Optional[str] = None, *, message: str):
+    await run_command("viewadd", PrefixReply(ctx), handle_prefix_viewadd, str(ctx.author.id), category, message)
+
+@bot.command(name="view")
+async def view(ctx, category: Optional[str] = None):
+    await run_command("view", PrefixReply(ctx), handle_view, str(ctx.author.id), category)
+
+@bot.command(name="viewcategories")
+async def viewcategories(ctx):
+    await run_command("viewcategories", PrefixReply(ctx), handle_viewcategories, str(ctx.author.id))
+
+@bot.command(name="viewdelete")
+async def viewdelete(ctx, *message_ids: str):
+    await run_command("viewdelete", PrefixReply(ctx), handle_viewdelete, str(ctx.author.id), list(message_ids))
+
+@bot.command(name="viewdeletecategory")
+async def viewdeletecategory(ctx, *, category: str):
+    await run_command("viewdeletecategory", PrefixReply(ctx), handle_viewdeletecategory, str(ctx.author.id), category)
+
+@bot.command(name="viewdeleteolder")
+async def viewdeleteolder(ctx, age: str):
+    await run_command("viewdeleteolder", PrefixReply(ctx), handle_viewdeleteolder, str(ctx.author.id), age)
+
+@bot.tree.command(name="viewadd", description="Add a secret message")
+async def slash_viewadd(interaction: discord.Interaction, message: str, category: Optional[str] = None,
+                        ttl: Optional[str] = None):
+    try:
+        ttl_seconds = parse_ttl(ttl) if ttl else None
+    except ValueError as e:
+        await interaction.response.send_message(str(e), ephemeral=True)
+        return
+    await run_command("viewadd", InteractionReply(interaction), handle_viewadd, str(interaction.user.id), category,
+                      message, ttl_seconds)
+
+@bot.tree.command(name="view", description="Show secret messages, optionally from one category")
+async def slash_view(interaction: discord.Interaction, category: Optional[str] = None):
+    await run_command("view", InteractionReply(interaction), handle_view, str(interaction.user.id), category)
+
+@bot.tree.command(name="viewcategories", description="List categories with their message counts")
+async def slash_viewcategories(interaction: discord.Interaction):
+    await run_command("viewcategories", InteractionReply(interaction), handle_viewcategories, str(interaction.user.id))
+
+@bot.tree.command(name="viewdelete", description="Delete secret messages by their IDs, separated by spaces")
+async def slash_viewdelete(interaction: discord.Interaction, message_ids: str):
+    await run_command("viewdelete", InteractionReply(interaction), handle_viewdelete, str(interaction.user.id),
+                      message_ids.split())
+
+@bot.tree.command(name="viewdeletecategory", description="Delete every message in a category")
+async def slash_viewdeletecategory(interaction: discord.Interaction, category: str):
+    await run_command("viewdeletecategory", InteractionReply(interaction), handle_viewdeletecategory,
+                      str(interaction.user.id), category)
+
+@bot.tree.command(name="viewdeleteolder", description="Delete messages older than an age such as 30d")
+async def slash_viewdeleteolder(interaction: discord.Interaction, age: str):
+    await run_command("viewdeleteolder", InteractionReply(interaction), handle_viewdeleteolder,
+                      str(interaction.user.id), age)
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error):
+    error_message = f"There was an error: {str(error)}"
+    logger.error(f"Slash command error: {error}")
+
+    try:
+        if interaction.response.is_done():
+            await interaction.followup.send(error_message, ephemeral=True)
+        else:
+            await interaction.response.send_message(error_message, ephemeral=True)
+    except:
+        pass
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -257,7 +1212,7 @@ async def run_api():
     config = uvicorn.Config(
         app,
         host="0.0.0.0",
-        port=8000, #change this if you want different port
+        port=settings.API_PORT, #change API_PORT in .env if you want different port
         log_level="info"
     )
     server = uvicorn.Server(config)
@@ -266,9 +1221,53 @@ async def run_api():
     except Exception as e:
         logger.error(f"Error starting API server: {e}")
 
+async def follow_journal():
+    # Tails the primary's journal into the local database. Starts from the stored checkpoint,
+    # so after downtime it catches up in FOLLOW_BATCH sized steps before polling again.
+    # New replicas, and replicas whose next entries were already pruned, load a snapshot first
+    if not settings.ADMIN_API_KEY:
+        logger.error("ADMIN_API_KEY must be set to the primary's admin key to follow its journal")
+        return
+    last_seq = message_manager.get_checkpoint()
+    needs_snapshot = last_seq == 0
+    logger.info(f"Following {settings.FOLLOW_URL} from journal entry {last_seq}")
+    async with aiohttp.ClientSession(headers={"X-API-Key": settings.ADMIN_API_KEY}) as session:
+        while True:
+            try:
+                if needs_snapshot:
+                    async with session.get(f"{settings.FOLLOW_URL}/snapshot") as response:
+                        response.raise_for_status()
+                        snapshot = await response.json()
+                    last_seq = message_manager.apply_snapshot(snapshot["seq"], snapshot["messages"])
+                    needs_snapshot = False
+                    logger.info(f"Loaded snapshot of {len(snapshot['messages'])} messages at entry {last_seq}")
+                async with session.get(
+                    f"{settings.FOLLOW_URL}/journal",
+                    params={"after": last_seq, "limit": settings.FOLLOW_BATCH}
+                ) as response:
+                    response.raise_for_status()
+                    journal = await response.json()
+                if journal["compacted_through"] > last_seq:
+                    logger.warning(f"Journal was pruned past entry {last_seq}, reloading snapshot")
+                    needs_snapshot = True
+                    continue
+                entries = journal["entries"]
+                if entries:
+                    last_seq = message_manager.apply_journal(entries)
+                    logger.info(f"Applied journal up to entry {last_seq}")
+                    if len(entries) == settings.FOLLOW_BATCH:
+                        continue
+            except Exception as e:
+                logger.error(f"Error following journal: {e}")
+            await asyncio.sleep(settings.FOLLOW_POLL_INTERVAL)
+
 async def main():
     try:
-        await asyncio.gather(run_bot(), run_api())
+        if settings.FOLLOW_URL:
+            # Replicas only serve read traffic; the bot and the sweeper run on the primary
+            await asyncio.gather(run_api(), follow_journal())
+        else:
+            await asyncio.gather(run_bot(), run_api(), sweep_expired_messages())
     except Exception as e:
         logger.error(f"Error in main: {e}")
 
@@ -0,0 +1,293 @@
+from __future__ import annotations
+import time
+# Both the UI and the headless agent import this module first, so this is close to process start
+_START_TIME = time.perf_counter()
+import sys
+import json
+import requests
+import os
+import random
+from cryptography.fernet import Fernet
+from typing import Dict, Any
+from dataclasses import dataclass
+from abc import ABC, abstractmethod
+import logging
+
+# Shared by client.py (headless agent and entry point) and gui.py (Qt UI)
+
+@dataclass
+class ConnectionConfig:
+   
+    api_url: str = "http://localhost:8000" # replace with your API URL, it will be on port 8000 since that is what the backend is configurated.
+    ping_interval: int = 15000  # 15 seconds, used until the server recommends its own interval
+    min_ping_interval: int = 5000 # Lower bound for the interval the server recommends
+    max_ping_interval: int = 300000 # Upper bound for the interval the server recommends and for backoff
+    ping_jitter: float = 0.2 # Each interval is randomly shortened by up to this fraction so clients don't ping in lockstep
+    max_retries: int = 5 # How many times it retries before it gives up
+    retry_base_delay: int = 2000 # Upper bound of the first retry delay, doubled for every further retry up to max_ping_interval
+    timeout: int = 5 # How long it waits for a response from the server before it gives up
+
+class CryptoHandler:
+
+    def __init__(self, key_file: str = "config.key"):
+        self.key_file = key_file
+        self._ensure_key_directory()
+        self.key = self._initialize_key()
+        self.cipher_suite = Fernet(self.key)
+
+    def _ensure_key_directory(self) -> None:
+
+        try:
+            directory = os.path.dirname(os.path.abspath(self.key_file))
+            if not os.path.exists(directory):
+                os.makedirs(directory, mode=0o700)  
+        except Exception as e:
+            logging.error(f"Failed to create key directory: {e}")
+            raise RuntimeError(f"Could not create key directory: {e}")
+
+    def _initialize_key(self) -> bytes:
+ 
+        try:
+            if os.path.exists(self.key_file):
+           
+                try:
+                    with open(self.key_file, "rb") as key_file:
+                        existing_key = key_file.read().strip()
+                        if self._is_valid_key(existing_key):
+                            return existing_key
+                except Exception as e:
+                    logging.warning(f"Existing key file corrupted, creating new: {e}")
+
+            return self._generate_new_key()
+
+        except Exception as e:
+            logging.error(f"Critical error initializing encryption key: {e}")
+            raise RuntimeError(f"Failed to initialize encryption key: {e}")
+
+    def _generate_new_key(self) -> bytes:
+ 
+        try:
+            key = Fernet.generate_key()
+            
+            if os.name == 'posix':  
+                os.umask(0o077)  
+            
+            with open(self.key_file, "wb") as key_file:
+                key_file.write(key)
+            
+            if os.name == 'nt':
+                import win32security
+                import ntsecuritycon as con
+                
+                security = win32security.GetFileSecurity(
+                    self.key_file, 
+                    win32security.OWNER_SECURITY_INFORMATION
+                )
+                user = security.GetSecurityDescriptorOwner()
+                
+                dacl = win32security.ACL()
+                dacl.AddAccessAllowedAce(
+                    win32security.ACL_REVISION,
+                    con.FILE_ALL_ACCESS,
+                    user
+                )
+                
+                security.SetSecurityDescriptorDacl(1, dacl, 0)
+                win32security.SetFileSecurity(
+                    self.key_file, 
+                    win32security.DACL_SECURITY_INFORMATION,
+                    security
+                )
+
+            logging.info("Generated and saved new encryption key")
+            return key
+
+        except Exception as e:
+            logging.error(f"Failed to generate new key: {e}")
+            raise RuntimeError(f"Could not generate new encryption key: {e}")
+
+    def _is_valid_key(self, key: bytes) -> bool:
+        
+        try:
+            Fernet(key)
+            return True
+        except Exception:
+            return False
+
+    def encrypt(self, data: str) -> str:
+  
+        try:
+            return self.cipher_suite.encrypt(data.encode()).decode()
+        except Exception as e:
+            logging.error(f"Encryption error: {e}")
+            raise RuntimeError(f"Encryption failed: {e}")
+
+    def decrypt(self, encrypted_data: str) -> str:
+
+        try:
+            return self.cipher_suite.decrypt(encrypted_data.encode()).decode()
+        except Exception as e:
+           
+            return ""
+
+class ApiClient:
+
+    def __init__(self, config: ConnectionConfig):
+        self.config = config
+
+    def send_ping(self, api_key: str, user_id: str) -> requests.Response:
+        headers = {
+            "X-API-Key": api_key,
+            "User-Agent": "Discord-Monitor/1.0"
+        }
+        try:
+            response = requests.post(
+                f"{self.config.api_url}/ping/{user_id}",
+                headers=headers,
+                timeout=self.config.timeout
+            )
+            return response
+        except requests.RequestException as e:
+            logging.error(f"API request error: {e}")
+            raise
+
+def is_retryable(status_code: int) -> bool:
+    # Other 4xx responses (a wrong API key, a bad request) fail the same way on every retry
+    return status_code >= 500 or status_code in (408, 429)
+
+class HeartbeatScheduler:
+
+    def __init__(self, config: ConnectionConfig):
+        self.config = config
+        self.reset()
+
+    def update_from_response(self, response: requests.Response) -> None:
+        # The server returns its recommended interval as "next_ping" and how long the
+        # session stays active after this ping as "ttl", both in seconds
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        next_ping = data.get("next_ping")
+        if isinstance(next_ping, (int, float)) and next_ping > 0:
+            self.interval = int(min(
+                max(next_ping * 1000, self.config.min_ping_interval),
+                self.config.max_ping_interval
+            ))
+        ttl = data.get("ttl")
+        ttl_ms = ttl * 1000 if isinstance(ttl, (int, float)) and ttl > 0 else self.interval * 2
+        self.session_deadline = time.monotonic() + ttl_ms / 1000
+
+    def next_delay(self, retry_count: int = 0) -> int:
+        if retry_count == 0:
+            # Jitter only ever shortens the delay so clients spread out without missing the TTL
+            jitter = 1 - random.uniform(0, self.config.ping_jitter)
+            return int(self.interval * jitter)
+
+        # Retries back off exponentially with full jitter, so clients of an overloaded or
+        # restarting server spread out and ping less often instead of more
+        backoff = min(self.config.retry_base_delay * 2 ** (retry_count - 1), self.config.max_ping_interval)
+        if retry_count == 1:
+            # The first retry still lands within the session, so one dropped ping doesn't end it
+            remaining_ms = (self.session_deadline - time.monotonic()) * 1000
+            if remaining_ms > 0:
+                backoff = min(backoff, remaining_ms / 2)
+        return int(max(random.uniform(0, backoff), 500))
+
+    def reset(self) -> None:
+        self.interval = self.config.ping_interval
+        self.session_deadline = 0.0
+
+class CredentialManager(ABC):
+    # Encrypts and decrypts saved credentials; subclasses only decide where the values are stored
+
+    def __init__(self, crypto_handler: CryptoHandler):
+        self.crypto = crypto_handler
+
+    def save_credentials(self, api_key: str, user_id: str):
+        try:
+            self._write({
+                "api_key": self.crypto.encrypt(api_key),
+                "user_id": self.crypto.encrypt(user_id),
+                "remember_credentials": True
+            })
+        except Exception as e:
+            logging.error(f"Error saving credentials: {e}")
+            raise
+
+    def load_credentials(self) -> tuple[str, str, bool]:
+        try:
+            data = self._read()
+            if data.get("remember_credentials"):
+                api_key = self.crypto.decrypt(data.get("api_key", ""))
+                user_id = self.crypto.decrypt(data.get("user_id", ""))
+                return api_key, user_id, True
+            return "", "", False
+        except Exception as e:
+            logging.error(f"Error loading credentials: {e}")
+            return "", "", False
+
+    @abstractmethod
+    def _read(self) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def _write(self, values: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def clear_settings(self):
+        pass
+
+class FileSettingsManager(CredentialManager):
+    # Used by both the UI and the headless agent, so credentials saved in one work in the other
+
+    def __init__(self, crypto_handler: CryptoHandler, settings_file: str = "credentials.json"):
+        super().__init__(crypto_handler)
+        self.settings_file = settings_file
+
+    def _read(self) -> Dict[str, Any]:
+        if not os.path.exists(self.settings_file):
+            return {}
+        with open(self.settings_file, "r") as settings_file:
+            return json.load(settings_file)
+
+    def _write(self, values: Dict[str, Any]) -> None:
+        # Only the owner may read the file, and it replaces the old one only once fully written
+        temp_file = f"{self.settings_file}.tmp"
+        fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        if os.name == 'posix':
+            os.fchmod(fd, 0o600)  # in case the temp file was left behind by an earlier run
+        with os.fdopen(fd, "w") as settings_file:
+            json.dump(values, settings_file)
+            settings_file.flush()
+            os.fsync(settings_file.fileno())
+        os.replace(temp_file, self.settings_file)
+
+    def clear_settings(self):
+        if os.path.exists(self.settings_file):
+            os.remove(self.settings_file)
+
+def get_process_stats() -> tuple[float, float]:
+    # Returns (startup time in ms, resident memory in MB) for the current process
+    startup_ms = (time.perf_counter() - _START_TIME) * 1000
+    rss_mb = 0.0
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    rss_mb = int(line.split()[1]) / 1024
+                    break
+    except OSError:
+        try:
+            import resource
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+        except ImportError:
+            pass
+    return startup_ms, rss_mb
+
+def report_process_stats(mode: str) -> None:
+    # Printed rather than logged, since the UI has logging turned off by default
+    startup_ms, rss_mb = get_process_stats()
+    print(f"{mode} ready - startup: {startup_ms:.0f} ms, RSS: {rss_mb:.1f} MB", flush=True)